@@ -1 +1 @@
-from .auth import MyTelegramClient, authorize_client
+from .auth import MyTelegramClient, authorize_client, BackgroundExporter, shutdown_default_exporter
@@ -1,6 +1,9 @@
 import asyncio
+import atexit
+import concurrent.futures
 import logging
 import os
+import threading
 import hashlib
 import time
 import json
@@ -99,9 +102,10 @@ def _find_bundle_in_accounts() -> str:
             continue
     return ""
 
-def get_proxy():
+def get_proxy(proxies: str = None):
     """
     Получить прокси-соединение из переменных окружения (ОБЯЗАТЕЛЬНО)
+    Если передан proxies — используется он вместо значения PROXIES из ENV.
     
     Формат PROXIES:
     - host:port                          (socks5 по умолчанию, без авторизации)
@@ -114,7 +118,8 @@ def get_proxy():
     - PROXIES=socks5:ansible.9qw.ru:8126:admin:tghyjuki
     - PROXIES=proxy.example.com:1080
     """
-    proxies = os.getenv("PROXIES")
+    if proxies is None:
+        proxies = os.getenv("PROXIES")
     
     # ОБЯЗАТЕЛЬНАЯ проверка наличия прокси
     if not proxies:
@@ -516,29 +521,41 @@ def _default_accounts_dir() -> str:
     return os.path.join(os.getcwd(), 'accounts')
 
 
+def _write_bundle_json(json_path: str, cfg: dict):
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, ensure_ascii=False)
+
+
 async def export_bundle_from_tdata(tdata_path: str, out_dir: str, basename: str,
-                                   api_id: int = None, api_hash: str = None) -> bool:
+                                   api_id: int = None, api_hash: str = None,
+                                   proxy_conn: dict = None) -> bool:
     """
     Экспортирует из папки tdata пару файлов: <basename>.session и <basename>.json в out_dir.
     По умолчанию использует ключи Telegram Desktop (2040/b184...).
     ВНИМАНИЕ: Требует обязательного наличия прокси в ENV.
+    Если передан уже проверенный proxy_conn — повторная проверка прокси не выполняется.
     """
+    # Блокирующие операции (проверка прокси, чтение tdata, запись файлов) выполняем
+    # в пуле потоков, чтобы не останавливать другие задачи на том же loop
+    loop = asyncio.get_running_loop()
+
     # ОБЯЗАТЕЛЬНАЯ проверка прокси
-    try:
-        proxy_conn = get_proxy()
-        validate_proxy_connection(proxy_conn)
-    except (ValueError, ConnectionError) as e:
-        logger.error(f"❌ Ошибка при экспорте: {e}")
-        return False
+    if proxy_conn is None:
+        try:
+            proxy_conn = get_proxy()
+            await loop.run_in_executor(None, validate_proxy_connection, proxy_conn)
+        except (ValueError, ConnectionError) as e:
+            logger.error(f"❌ Ошибка при экспорте: {e}")
+            return False
     
     if not os.path.isdir(tdata_path):
         logger.error(f"❌ Директория tdata не найдена: {tdata_path}")
         return False
 
-    os.makedirs(out_dir, exist_ok=True)
+    await loop.run_in_executor(None, lambda: os.makedirs(out_dir, exist_ok=True))
 
     try:
-        tdesk = TDesktop(tdata_path)
+        tdesk = await loop.run_in_executor(None, TDesktop, tdata_path)
         if not tdesk.accounts:
             logger.error("❌ Аккаунты не найдены в tdata")
             return False
@@ -606,8 +623,7 @@ async def export_bundle_from_tdata(tdata_path: str, out_dir: str, basename: str,
             "ipv6": False,
             "session_file": basename
         }
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, ensure_ascii=False)
+        await loop.run_in_executor(None, _write_bundle_json, json_path, cfg)
 
         logger.info(f"✅ Бандл сохранён: {json_path} и {session_path}")
         return True
@@ -616,6 +632,216 @@ async def export_bundle_from_tdata(tdata_path: str, out_dir: str, basename: str,
         return False
 
 
+class BackgroundExporter:
+    """
+    Синхронный фасад над export_bundle_from_tdata на одном долгоживущем event loop.
+
+    Loop крутится в отдельном фоновом потоке; submit()/submit_auto() можно вызывать
+    из любых потоков — они возвращают concurrent.futures.Future с результатом (bool).
+    Проверенный прокси кэшируется по значению PROXIES из ENV: пока оно не меняется,
+    повторная проверка не выполняется. Кэш сбрасывается, если PROXIES изменился,
+    если проверка не прошла или если экспорт завершился неудачей — тогда следующая
+    задача проверит прокси заново.
+
+    max_concurrency ограничивает число одновременно выполняемых экспортов (соединений
+    через прокси и расшифровок tdata); None — без ограничения.
+
+        with BackgroundExporter(max_concurrency=4) as exporter:
+            futures = [exporter.submit_auto(p) for p in tdata_paths]
+            results = [f.result() for f in futures]
+    """
+
+    def __init__(self, max_concurrency: int = None):
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f"❌ max_concurrency должен быть >= 1: {max_concurrency}")
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._closed = False
+        # Кэш проверки прокси: (значение PROXIES, future); трогается только из потока loop
+        self._proxy_cache = None
+        # Futures, возвращённые submit() и ещё не завершённые
+        self._futures = set()
+        # Семафор создаётся лениво в потоке loop, чтобы привязаться к нужному loop
+        self._semaphore = None
+
+    def start(self):
+        """Запускает фоновый поток с event loop (повторный вызов ничего не делает)."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BackgroundExporter уже остановлен")
+            if self._thread is not None:
+                return self
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+            thread = threading.Thread(
+                target=self._run_loop,
+                args=(loop, started),
+                name="tdata-exporter-loop",
+                daemon=True,
+            )
+            thread.start()
+            started.wait()
+            self._loop = loop
+            self._thread = thread
+        return self
+
+    @staticmethod
+    def _run_loop(loop, started):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+    async def _get_proxy_conn(self, proxies):
+        if self._proxy_cache is None or self._proxy_cache[0] != proxies:
+            loop = asyncio.get_running_loop()
+
+            def _resolve():
+                proxy_conn = get_proxy(proxies)
+                validate_proxy_connection(proxy_conn)
+                return proxy_conn
+
+            # Проверка прокси блокирующая — выносим её из loop в пул потоков
+            self._proxy_cache = (proxies, loop.run_in_executor(None, _resolve))
+        cache = self._proxy_cache
+        try:
+            return cache, await asyncio.shield(cache[1])
+        except (ValueError, ConnectionError):
+            self._drop_proxy_cache(cache)
+            raise
+
+    def _drop_proxy_cache(self, cache):
+        if self._proxy_cache is cache:
+            self._proxy_cache = None
+
+    async def _export(self, tdata_path, out_dir, basename, api_id, api_hash, proxies):
+        if self.max_concurrency is None:
+            return await self._export_unbounded(tdata_path, out_dir, basename, api_id, api_hash, proxies)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await self._export_unbounded(tdata_path, out_dir, basename, api_id, api_hash, proxies)
+
+    async def _export_unbounded(self, tdata_path, out_dir, basename, api_id, api_hash, proxies):
+        try:
+            cache, proxy_conn = await self._get_proxy_conn(proxies)
+        except (ValueError, ConnectionError) as e:
+            logger.error(f"❌ Ошибка при экспорте: {e}")
+            return False
+        ok = await export_bundle_from_tdata(tdata_path, out_dir, basename, api_id, api_hash,
+                                            proxy_conn=proxy_conn)
+        if not ok:
+            # Прокси мог перестать работать — следующая задача проверит его заново
+            self._drop_proxy_cache(cache)
+        return ok
+
+    def submit(self, tdata_path: str, out_dir: str, basename: str,
+               api_id: int = None, api_hash: str = None):
+        """Ставит экспорт в очередь и возвращает concurrent.futures.Future[bool]."""
+        self.start()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BackgroundExporter уже остановлен")
+            future = asyncio.run_coroutine_threadsafe(
+                # PROXIES читаем в момент постановки задачи, в потоке вызывающего
+                self._export(tdata_path, out_dir, basename, api_id, api_hash, os.getenv("PROXIES")),
+                self._loop,
+            )
+            self._futures.add(future)
+        # Колбэк вешаем вне блокировки: для уже завершённой future он вызывается сразу
+        future.add_done_callback(self._forget_future)
+        return future
+
+    def _forget_future(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def submit_auto(self, tdata_path: str, out_base_dir: str = None,
+                    api_id: int = None, api_hash: str = None):
+        """Как export_bundle_from_tdata_auto, но возвращает concurrent.futures.Future[bool]."""
+        basename = _derive_basename_from_tdata(tdata_path)
+        base_dir = out_base_dir or _default_accounts_dir()
+        out_dir = os.path.join(base_dir, basename)
+        return self.submit(tdata_path, out_dir, basename, api_id, api_hash)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Останавливает loop. При wait=True дожидается завершения задач, поставленных
+        через submit(), иначе отменяет их. Остальные задачи на loop (например, фоновые
+        задачи Telethon) отменяются. Новые задачи после вызова не принимаются.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, thread = self._loop, self._thread
+            pending = list(self._futures)
+        if loop is None:
+            return
+
+        if wait and pending and thread is not threading.current_thread():
+            concurrent.futures.wait(pending)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not threading.current_thread():
+            thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+_default_exporter = None
+_default_exporter_pid = None
+_default_exporter_lock = threading.Lock()
+
+
+def get_default_exporter() -> BackgroundExporter:
+    """
+    Возвращает общий для процесса BackgroundExporter (создаётся при первом вызове).
+    После fork() в дочернем процессе создаётся новый: поток loop родителя туда не копируется.
+    """
+    global _default_exporter, _default_exporter_pid
+    with _default_exporter_lock:
+        if _default_exporter is None or _default_exporter_pid != os.getpid():
+            _default_exporter = BackgroundExporter().start()
+            _default_exporter_pid = os.getpid()
+        return _default_exporter
+
+
+def shutdown_default_exporter(wait: bool = True):
+    """
+    Останавливает общий BackgroundExporter. Следующий вызов
+    export_bundle_from_tdata_sync/_auto запустит новый.
+    """
+    global _default_exporter, _default_exporter_pid
+    with _default_exporter_lock:
+        exporter = _default_exporter
+        owned = _default_exporter_pid == os.getpid()
+        _default_exporter = None
+        _default_exporter_pid = None
+    # Экспортер, унаследованный через fork(), останавливать нечего — его loop остался в родителе
+    if exporter is not None and owned:
+        exporter.shutdown(wait=wait)
+
+
+# При выходе не ждём зависших сетевых задач — отменяем их
+atexit.register(shutdown_default_exporter, wait=False)
+
+
 def export_bundle_from_tdata_auto(tdata_path: str,
                                   out_base_dir: str = None,
                                   api_id: int = None,
@@ -624,14 +850,15 @@ def export_bundle_from_tdata_auto(tdata_path: str,
     Упрощённый экспорт: достаточно указать только путь к tdata.
     По умолчанию сохранит в <cwd>/accounts/<basename>/{basename}.session и .json,
     где basename — это имя папки родителя над tdata (например, "+2349049675164").
+    Прокси проверяется заново при смене PROXIES в ENV и после неудачного экспорта.
     """
-    basename = _derive_basename_from_tdata(tdata_path)
-    base_dir = out_base_dir or _default_accounts_dir()
-    out_dir = os.path.join(base_dir, basename)
-    return asyncio.run(export_bundle_from_tdata(tdata_path, out_dir, basename, api_id, api_hash))
+    return get_default_exporter().submit_auto(tdata_path, out_base_dir, api_id, api_hash).result()
 
 
 def export_bundle_from_tdata_sync(tdata_path: str, out_dir: str, basename: str,
                                   api_id: int = None, api_hash: str = None) -> bool:
-    """Синхронная обёртка над export_bundle_from_tdata."""
-    return asyncio.run(export_bundle_from_tdata(tdata_path, out_dir, basename, api_id, api_hash))
+    """
+    Синхронная обёртка над export_bundle_from_tdata (через общий фоновый loop).
+    Прокси проверяется заново при смене PROXIES в ENV и после неудачного экспорта.
+    """
+    return get_default_exporter().submit(tdata_path, out_dir, basename, api_id, api_hash).result()
@@ -0,0 +1,246 @@
+import asyncio
+import atexit
+import importlib.util
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tdata_session_exporter import auth
+from tdata_session_exporter.auth import BackgroundExporter
+
+
+@pytest.fixture
+def proxy_checks(monkeypatch):
+    """Подменяет проверку прокси и возвращает список проверенных адресов."""
+    checked = []
+    monkeypatch.setenv("PROXIES", "h1:1080")
+    monkeypatch.setattr(auth, "validate_proxy_connection", lambda proxy_conn: checked.append(proxy_conn['addr']) or True)
+    return checked
+
+
+@pytest.fixture
+def exports(monkeypatch):
+    """Подменяет export_bundle_from_tdata и возвращает список вызовов."""
+    calls = []
+
+    async def fake_export(tdata_path, out_dir, basename, api_id=None, api_hash=None, proxy_conn=None):
+        calls.append((basename, proxy_conn['addr'], threading.current_thread().name))
+        await asyncio.sleep(0.01)
+        return True
+
+    monkeypatch.setattr(auth, "export_bundle_from_tdata", fake_export)
+    return calls
+
+
+@pytest.fixture(autouse=True)
+def reset_default_exporter():
+    yield
+    auth.shutdown_default_exporter()
+
+
+def test_concurrent_submit_shares_loop_and_proxy_check(proxy_checks, exports):
+    with BackgroundExporter() as exporter:
+        with ThreadPoolExecutor(8) as pool:
+            futures = list(pool.map(lambda n: exporter.submit("/tdata", "/out", f"acc{n}"), range(20)))
+        assert [f.result(timeout=5) for f in futures] == [True] * 20
+
+    assert proxy_checks == ["h1"]
+    assert sorted(name for name, _, _ in exports) == sorted(f"acc{n}" for n in range(20))
+    assert {thread for _, _, thread in exports} == {"tdata-exporter-loop"}
+
+
+def test_proxy_rechecked_after_failed_check(monkeypatch, proxy_checks, exports):
+    def flaky_validate(proxy_conn):
+        proxy_checks.append(proxy_conn['addr'])
+        if len(proxy_checks) == 1:
+            raise ConnectionError("proxy down")
+        return True
+
+    monkeypatch.setattr(auth, "validate_proxy_connection", flaky_validate)
+    with BackgroundExporter() as exporter:
+        assert exporter.submit("/tdata", "/out", "a").result(timeout=5) is False
+        assert exporter.submit("/tdata", "/out", "b").result(timeout=5) is True
+        assert exporter.submit("/tdata", "/out", "c").result(timeout=5) is True
+
+    assert proxy_checks == ["h1", "h1"]
+    assert [name for name, _, _ in exports] == ["b", "c"]
+
+
+def test_proxy_rechecked_when_env_changes(monkeypatch, proxy_checks, exports):
+    with BackgroundExporter() as exporter:
+        exporter.submit("/tdata", "/out", "a").result(timeout=5)
+        monkeypatch.setenv("PROXIES", "h2:1080")
+        exporter.submit("/tdata", "/out", "b").result(timeout=5)
+
+    assert proxy_checks == ["h1", "h2"]
+    assert [(name, addr) for name, addr, _ in exports] == [("a", "h1"), ("b", "h2")]
+
+
+def test_proxy_rechecked_after_failed_export(monkeypatch, proxy_checks):
+    results = iter([False, True])
+
+    async def fake_export(*args, **kwargs):
+        return next(results)
+
+    monkeypatch.setattr(auth, "export_bundle_from_tdata", fake_export)
+    with BackgroundExporter() as exporter:
+        assert exporter.submit("/tdata", "/out", "a").result(timeout=5) is False
+        assert exporter.submit("/tdata", "/out", "b").result(timeout=5) is True
+
+    assert proxy_checks == ["h1", "h1"]
+
+
+def test_shutdown_wait_drains_queued_work(proxy_checks, exports):
+    exporter = BackgroundExporter()
+    futures = [exporter.submit("/tdata", "/out", f"acc{n}") for n in range(5)]
+    exporter.shutdown(wait=True)
+
+    assert all(f.done() and f.result() is True for f in futures)
+    assert len(exports) == 5
+
+
+def test_shutdown_without_wait_cancels_futures(monkeypatch, proxy_checks):
+    started = threading.Event()
+
+    async def hanging_export(*args, **kwargs):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(auth, "export_bundle_from_tdata", hanging_export)
+    exporter = BackgroundExporter()
+    future = exporter.submit("/tdata", "/out", "a")
+    assert started.wait(timeout=5)
+    exporter.shutdown(wait=False)
+
+    assert future.cancelled()
+
+
+def test_submit_after_shutdown_raises(proxy_checks, exports):
+    exporter = BackgroundExporter().start()
+    exporter.shutdown()
+
+    with pytest.raises(RuntimeError):
+        exporter.submit("/tdata", "/out", "a")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="требуется os.fork")
+def test_default_exporter_recreated_after_fork(proxy_checks, exports):
+    parent = auth.get_default_exporter()
+    assert auth.export_bundle_from_tdata_sync("/tdata", "/out", "parent") is True
+
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+
+    def child():
+        queue.put((auth.get_default_exporter() is not parent,
+                   auth.export_bundle_from_tdata_sync("/tdata", "/out", "child")))
+
+    process = ctx.Process(target=child)
+    process.start()
+    try:
+        assert queue.get(timeout=10) == (True, True)
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+
+
+def test_shutdown_default_exporter_allows_restart(proxy_checks, exports):
+    first = auth.get_default_exporter()
+    assert auth.export_bundle_from_tdata_sync("/tdata", "/out", "a") is True
+    auth.shutdown_default_exporter()
+
+    with pytest.raises(RuntimeError):
+        first.submit("/tdata", "/out", "b")
+    assert auth.export_bundle_from_tdata_sync("/tdata", "/out", "b") is True
+    assert auth.get_default_exporter() is not first
+
+
+def test_max_concurrency_limits_running_exports(monkeypatch, proxy_checks):
+    running = []
+    peak = []
+
+    async def fake_export(*args, **kwargs):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.pop()
+        return True
+
+    monkeypatch.setattr(auth, "export_bundle_from_tdata", fake_export)
+    with BackgroundExporter(max_concurrency=2) as exporter:
+        futures = [exporter.submit("/tdata", "/out", f"acc{n}") for n in range(6)]
+        assert [f.result(timeout=5) for f in futures] == [True] * 6
+
+    assert max(peak) == 2
+
+
+def test_max_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        BackgroundExporter(max_concurrency=0)
+
+
+def test_shutdown_wait_ignores_unrelated_loop_tasks(monkeypatch, proxy_checks):
+    async def export_leaving_task(*args, **kwargs):
+        # Как фоновые задачи Telethon: живут дольше самого экспорта
+        asyncio.get_running_loop().create_task(asyncio.Event().wait())
+        return True
+
+    monkeypatch.setattr(auth, "export_bundle_from_tdata", export_leaving_task)
+    exporter = BackgroundExporter()
+    future = exporter.submit("/tdata", "/out", "a")
+    assert future.result(timeout=5) is True
+
+    done = threading.Event()
+    threading.Thread(target=lambda: (exporter.shutdown(wait=True), done.set()), daemon=True).start()
+    assert done.wait(timeout=5)
+
+
+def test_sync_wrappers_share_default_exporter(tmp_path, proxy_checks, exports):
+    tdata_path = str(tmp_path / "+100" / "tdata")
+    assert auth.export_bundle_from_tdata_sync(tdata_path, "/out", "a") is True
+    exporter = auth.get_default_exporter()
+    assert auth.export_bundle_from_tdata_auto(tdata_path, str(tmp_path)) is True
+    assert auth.export_bundle_from_tdata_sync(tdata_path, "/out", "b") is True
+
+    assert auth.get_default_exporter() is exporter
+    assert proxy_checks == ["h1"]
+    assert [name for name, _, _ in exports] == ["a", "+100", "b"]
+    assert {thread for _, _, thread in exports} == {"tdata-exporter-loop"}
+
+
+def test_default_exporter_shutdown_registered_at_exit(monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", lambda func, *args, **kwargs: registered.append((func, kwargs)))
+
+    # Отдельная копия модуля, чтобы не трогать общий экспортер остальных тестов
+    spec = importlib.util.spec_from_file_location("_auth_copy", auth.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    assert registered == [(module.shutdown_default_exporter, {"wait": False})]
+
+
+def test_submit_auto_derives_out_dir_and_basename(monkeypatch, tmp_path):
+    calls = []
+
+    async def fake_export(tdata_path, out_dir, basename, api_id=None, api_hash=None, proxy_conn=None):
+        calls.append((tdata_path, out_dir, basename, api_id, api_hash))
+        return True
+
+    monkeypatch.setattr(auth, "validate_proxy_connection", lambda proxy_conn: True)
+    monkeypatch.setenv("PROXIES", "h1:1080")
+    monkeypatch.setattr(auth, "export_bundle_from_tdata", fake_export)
+    monkeypatch.chdir(tmp_path)
+    tdata_path = os.path.join("/data", "+2349049675164", "tdata")
+    with BackgroundExporter() as exporter:
+        exporter.submit_auto(tdata_path, "/out", api_id=1, api_hash="h").result(timeout=5)
+        exporter.submit_auto("/data/account42").result(timeout=5)
+
+    assert calls == [
+        (tdata_path, os.path.join("/out", "+2349049675164"), "+2349049675164", 1, "h"),
+        ("/data/account42", os.path.join(str(tmp_path), "accounts", "account42"), "account42", None, None),
+    ]